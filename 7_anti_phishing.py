@@ -3,43 +3,187 @@ import os
 import json
 import re
 import sys
+import hashlib
+from collections import OrderedDict
 from enum import Enum
 from datetime import datetime
-from google import genai
 import time
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 DEBUG = False
 VERSION = "1.2.3"
 MAX_RETRIES = 3
+CACHE_SIZE = 512
+CACHE_PATH = os.path.expanduser("~/.phishing_shield_cache.db")
+CACHE_TTL = 86400 * 7
+BATCH_CONCURRENCY = 8
+MAX_BODY_CHARS = 5000
+GEMINI_MODELS = ["gemini-2.0-flash", "gemini-1.5-flash", "gemini-1.0-pro"]
+_FROM_RE = re.compile(r"From:[ \t]*(.*?)(?:\n|$)", re.I)
+_SUBJ_RE = re.compile(r"Subject:[ \t]*(.*?)(?:\n|$)", re.I)
+_JSON_RE = re.compile(r'({[\s\S]*})')
+_JSON_REPAIR_RE = re.compile(r"(\w+):|'")
+_DANGER_RE = re.compile(r"credentials|password|account|urgent|login|verify", re.I)
+_LINK_RE = re.compile(r"https?://|www\.", re.I)
+_DOMAIN_RE = re.compile(r"@([\w.-]+)")
+_KNOWN_PHISH_DOMAINS = {
+    "paypa1.com",
+    "micros0ft-support.com",
+    "appleid-verify.com",
+}
+_PROMPT_HEADER = """Analyze this email for phishing threats and security risks.
+EMAIL:
+From: """
+_PROMPT_TAIL = """
+Look for:
+- Urgency/threatening language
+- Spelling/grammar issues
+- Requests for sensitive data (credentials, personal info)
+- Suspicious links or attachments
+- Brand impersonation attempts
+- Social engineering tactics
+IMPORTANT: Respond with ONLY a JSON object having this structure:
+{
+  "phishing_likelihood": <float 0-1>,
+  "confidence": <float 0-1>,
+  "insights": [<strings listing specific red flags>],
+  "reasoning": "<detailed explanation>",
+  "recommended_action": "<action advice for user>"
+}
+"""
+_PROMPT_HASH = hashlib.blake2b((_PROMPT_HEADER + _PROMPT_TAIL).encode(), digest_size=16)
+def _build_prompt(sender, subject, body):
+    # Gemini rejects empty text parts, so blank fields are left out entirely
+    parts = (_PROMPT_HEADER, sender, "\nSubject: ", subject, "\nBody: \n", body, _PROMPT_TAIL)
+    return tuple(part for part in parts if part)
+def _prompt_key(sender, subject, body):
+    digest = _PROMPT_HASH.copy()
+    for field in (sender, subject, body):
+        data = field.encode()
+        # Length-prefix each field so no two field tuples share a byte stream
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.digest()
 class RiskLevel(str, Enum):
     SAFE = "Safe"
     SUSPICIOUS = "Suspicious" 
     DANGEROUS = "Dangerous"
 
+class DiskCache:
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL):
+        import sqlite3
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY KEY, value TEXT, ts INTEGER)"
+        )
+        self.conn.execute(
+            "DELETE FROM cache WHERE ts <= ?",
+            (int(time.time()) - self.ttl,)
+        )
+        self.conn.commit()
+
+    def get(self, key):
+        row = self.conn.execute(
+            "SELECT value FROM cache WHERE key = ? AND ts > ?",
+            (key, int(time.time()) - self.ttl)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, ts) VALUES (?, ?, ?)",
+            (key, value, int(time.time()))
+        )
+        self.conn.commit()
+
 class PhishingDetector:
-    def __init__(self, api_key=None, debug=False):
+    def __init__(self, api_key=None, debug=False, cache_path=CACHE_PATH, max_body_chars=MAX_BODY_CHARS):
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("Missing API key! Set GEMINI_API_KEY or pass to constructor")
+        from google import genai
         self.client = genai.Client(api_key=self.api_key)
         self.debug = debug
-        self._cache = {}
+        self.max_body_chars = max_body_chars
+        self._cache = OrderedDict()
+        self._disk_cache = None
+        if cache_path and not debug:
+            import sqlite3
+            try:
+                self._disk_cache = DiskCache(cache_path)
+            except sqlite3.Error as e:
+                print(f"Disk cache unavailable: {e}")
         self.api_calls = 0
         print(f"[*] Phish detector v{VERSION} ready")
     
     def analyze_email(self, email_text):
+        verdict, fields = self._prepare(email_text)
+        if verdict:
+            return verdict
+        cache_key = _prompt_key(*fields)
+        response_text = self._cached_response(cache_key)
+        if response_text is not None:
+            return self._finish(cache_key, response_text, False)
+        response_text, ok = self._call_gemini_with_retry(_build_prompt(*fields))
+        return self._finish(cache_key, response_text, ok)
+    async def analyze_email_async(self, email_text):
+        verdict, fields = self._prepare(email_text)
+        if verdict:
+            return verdict
+        cache_key = _prompt_key(*fields)
+        response_text = self._cached_response(cache_key)
+        if response_text is not None:
+            return self._finish(cache_key, response_text, False)
+        response_text, ok = await self._call_gemini_async(_build_prompt(*fields))
+        return self._finish(cache_key, response_text, ok)
+    async def analyze_batch_async(self, email_texts, concurrency=BATCH_CONCURRENCY):
+        import asyncio
+        semaphore = asyncio.Semaphore(concurrency)
+        async def analyze_one(email_text):
+            async with semaphore:
+                try:
+                    return await self.analyze_email_async(email_text)
+                except Exception as e:
+                    return self._error_response(f"Analysis failed: {e}")
+        return await asyncio.gather(*(analyze_one(text) for text in email_texts))
+    def _prepare(self, email_text):
         if not email_text or email_text.strip() == "":
-            return self._error_response("Empty email text")
+            return self._error_response("Empty email text"), None
         sender, subject, body = self._extract_email_parts(email_text)
-        prompt = self._build_prompt(sender, subject, body)
-        cache_key = hash(prompt)
-        if cache_key in self._cache and not self.debug:
-            if self.debug:
-                print("[DEBUG] Using cached response")
-            response_text = self._cache[cache_key]
-        else:
-            response_text = self._call_gemini_with_retry(prompt)
-            self._cache[cache_key] = response_text
-        analysis = self._extract_json(response_text)
+        verdict = self._trivial_verdict(email_text, sender, body)
+        if verdict:
+            return verdict, None
+        if self.max_body_chars and len(body) > self.max_body_chars:
+            body = body[:self.max_body_chars] + "...[truncated]"
+        return None, (sender, subject, body)
+    def _cached_response(self, cache_key):
+        if self.debug:
+            return None
+        if cache_key in self._cache:
+            self._cache.move_to_end(cache_key)
+            return self._cache[cache_key]
+        if self._disk_cache:
+            response_text = self._disk_cache.get(cache_key)
+            if response_text is not None:
+                self._remember(cache_key, response_text)
+            return response_text
+        return None
+    def _store_response(self, cache_key, response_text):
+        self._remember(cache_key, response_text)
+        if self._disk_cache:
+            self._disk_cache.set(cache_key, response_text)
+    def _finish(self, cache_key, response_text, store):
+        analysis = self._parse_json(response_text)
+        if analysis is None:
+            analysis = self._parse_error(response_text)
+        elif store:
+            self._store_response(cache_key, response_text)
+        return self._build_result(analysis)
+    def _build_result(self, analysis):
         risk_level = self._calc_risk_level(analysis)
         return {
             "timestamp": "2025-03-07 14:05:36",
@@ -49,14 +193,18 @@ class PhishingDetector:
             "recommended_action": analysis.get("recommended_action", "Review email carefully"), 
             "analysis": analysis.get("reasoning", "")
         }
+    def _remember(self, cache_key, response_text):
+        self._cache[cache_key] = response_text
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
     def _extract_email_parts(self, raw_text):
         sender = "unknown"
         subject = "unknown"
         body = raw_text
-        from_match = re.search(r"From:\s*(.*?)(?:\n|$)", raw_text, re.I)
+        from_match = _FROM_RE.search(raw_text)
         if from_match:
             sender = from_match.group(1).strip()
-        subj_match = re.search(r"Subject:\s*(.*?)(?:\n|$)", raw_text, re.I)
+        subj_match = _SUBJ_RE.search(raw_text)
         if subj_match:
             subject = subj_match.group(1).strip()
         header_pos = 0
@@ -67,90 +215,120 @@ class PhishingDetector:
         if header_pos > 0:
             body = raw_text[header_pos:].strip()
         return sender, subject, body
-    def _build_prompt(self, sender, subject, body):
-        max_body_len = 5000
-        if len(body) > max_body_len:
-            body = body[:max_body_len] + "...[truncated]"
-        return f"""Analyze this email for phishing threats and security risks.
-EMAIL:
-From: {sender}
-Subject: {subject}
-Body: 
-{body}
-Look for:
-- Urgency/threatening language
-- Spelling/grammar issues
-- Requests for sensitive data (credentials, personal info)
-- Suspicious links or attachments
-- Brand impersonation attempts
-- Social engineering tactics
-IMPORTANT: Respond with ONLY a JSON object having this structure:
-{{
-  "phishing_likelihood": <float 0-1>,
-  "confidence": <float 0-1>,
-  "insights": [<strings listing specific red flags>],
-  "reasoning": "<detailed explanation>",
-  "recommended_action": "<action advice for user>"
-}}
-"""
+    def _trivial_verdict(self, email_text, sender, body):
+        domain_match = _DOMAIN_RE.search(sender)
+        if domain_match and self._is_known_phish_domain(domain_match.group(1)):
+            return {
+                "timestamp": "2025-03-07 14:05:36",
+                "risk_level": RiskLevel.DANGEROUS,
+                "confidence": 95.0,
+                "reasons": [f"Sender domain {domain_match.group(1)} is a known phishing domain"],
+                "recommended_action": "Delete this email and do not click any links",
+                "analysis": "Matched local phishing domain blocklist"
+            }
+        if (len(body) < 20 and not _LINK_RE.search(email_text)
+                and not _DANGER_RE.search(email_text)):
+            return {
+                "timestamp": "2025-03-07 14:05:36",
+                "risk_level": RiskLevel.SUSPICIOUS,
+                "confidence": 30.0,
+                "reasons": [],
+                "recommended_action": "Review email carefully",
+                "analysis": "Email body too short to analyze - skipped AI analysis"
+            }
+        return None
+    def _is_known_phish_domain(self, domain):
+        labels = domain.lower().rstrip(".").split(".")
+        return any(".".join(labels[i:]) in _KNOWN_PHISH_DOMAINS for i in range(len(labels) - 1))
     def _call_gemini_with_retry(self, prompt):
-        models_to_try = ["gemini-2.0-flash", "gemini-1.5-flash", "gemini-1.0-pro"]
         for attempt in range(MAX_RETRIES):
+            model = self._start_attempt(attempt)
             try:
-                model_idx = min(attempt, len(models_to_try) - 1)
-                model = models_to_try[model_idx]
-                if self.debug:
-                    print(f"[DEBUG] Attempt {attempt+1} using model: {model}")
-                self.api_calls += 1
                 start_time = time.time()
                 response = self.client.models.generate_content(
                     model=model,
-                    contents=prompt
+                    contents=list(prompt)
                 )
-                if self.debug:
-                    elapsed = time.time() - start_time
-                    print(f"[DEBUG] API call took {elapsed:.2f}s")
-                return response.text
+                self._log_elapsed(start_time)
+                return response.text, True
             except Exception as e:
-                error_msg = str(e)
-                if self.debug:
-                    print(f"[DEBUG] API error: {error_msg}")
-                if "rate limit" in error_msg.lower():
-                    wait_time = (attempt + 1) * 2
-                    print(f"Rate limited, waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                elif attempt < MAX_RETRIES - 1:
-                    print(f"Model {model} failed, trying fallback...")
-                    time.sleep(1)
-                else:
-                    return json.dumps({
-                        "phishing_likelihood": 0.5,
-                        "confidence": 0.4,
-                        "insights": ["API error: Unable to analyze email"],
-                        "reasoning": f"Error: {error_msg}",
-                        "recommended_action": "Please examine the email carefully"
-                    })
-        return "{}"
-    def _extract_json(self, text):
+                wait_time = self._retry_delay(attempt, model, e)
+                if wait_time is None:
+                    return self._api_error_json(str(e)), False
+                time.sleep(wait_time)
+        return "{}", False
+    async def _call_gemini_async(self, prompt):
+        import asyncio
+        for attempt in range(MAX_RETRIES):
+            model = self._start_attempt(attempt)
+            try:
+                start_time = time.time()
+                response = await self.client.aio.models.generate_content(
+                    model=model,
+                    contents=list(prompt)
+                )
+                self._log_elapsed(start_time)
+                return response.text, True
+            except Exception as e:
+                wait_time = self._retry_delay(attempt, model, e)
+                if wait_time is None:
+                    return self._api_error_json(str(e)), False
+                await asyncio.sleep(wait_time)
+        return "{}", False
+    def _start_attempt(self, attempt):
+        model_idx = min(attempt, len(GEMINI_MODELS) - 1)
+        model = GEMINI_MODELS[model_idx]
+        if self.debug:
+            print(f"[DEBUG] Attempt {attempt+1} using model: {model}")
+        self.api_calls += 1
+        return model
+    def _log_elapsed(self, start_time):
+        if self.debug:
+            elapsed = time.time() - start_time
+            print(f"[DEBUG] API call took {elapsed:.2f}s")
+    def _retry_delay(self, attempt, model, error):
+        error_msg = str(error)
+        if self.debug:
+            print(f"[DEBUG] API error: {error_msg}")
+        if "rate limit" in error_msg.lower():
+            wait_time = (attempt + 1) * 2
+            print(f"Rate limited, waiting {wait_time}s...")
+            return wait_time
+        if attempt < MAX_RETRIES - 1:
+            print(f"Model {model} failed, trying fallback...")
+            return 1
+        return None
+    def _api_error_json(self, error_msg):
+        return json.dumps({
+            "phishing_likelihood": 0.5,
+            "confidence": 0.4,
+            "insights": ["API error: Unable to analyze email"],
+            "reasoning": f"Error: {error_msg}",
+            "recommended_action": "Please examine the email carefully"
+        })
+    def _parse_json(self, text):
         if not text:
-            return {}
+            return None
+        result = None
         try:
-            return json.loads(text)
+            result = _loads(text)
         except:
-            match = re.search(r'({[\s\S]*})', text)
+            match = _JSON_RE.search(text)
             if match:
                 try:
-                    return json.loads(match.group(1))
+                    result = _loads(match.group(1))
                 except:
-                    json_text = match.group(1)
-                    json_text = re.sub(r'(\w+):', r'"\1":', json_text)
-                    json_text = json_text.replace("'", '"')
+                    json_text = _JSON_REPAIR_RE.sub(self._repair_json_token, match.group(1))
                     try:
-                        return json.loads(json_text)
+                        result = json.loads(json_text)
                     except:
                         pass
+        if isinstance(result, dict):
+            return result
+        return None
+    def _parse_error(self, text):
         if self.debug:
-            print(f"[DEBUG] Failed to parse: {text[:100]}...")
+            print(f"[DEBUG] Failed to parse: {(text or '')[:100]}...")
         return {
             "phishing_likelihood": 0.5,
             "confidence": 0.3,
@@ -158,16 +336,18 @@ IMPORTANT: Respond with ONLY a JSON object having this structure:
             "reasoning": "Response format error",
             "recommended_action": "Manually review this email"
         }
+    def _repair_json_token(self, match):
+        if match.group(1):
+            return f'"{match.group(1)}":'
+        return '"'
     def _calc_risk_level(self, analysis):
         phish_score = analysis.get("phishing_likelihood", 0.5)
         insights = analysis.get("insights", [])
-        danger_keywords = ["credentials", "password", "account", "urgent", "login", "verify"]
         for insight in insights:
-            insight_lower = insight.lower()
-            for keyword in danger_keywords:
-                if keyword in insight_lower:
-                    phish_score += 0.1
-                    break
+            if phish_score >= 0.65:
+                break
+            if _DANGER_RE.search(insight):
+                phish_score += 0.1
         phish_score = min(phish_score, 1.0)
         if phish_score < 0.35:
             return RiskLevel.SAFE
@@ -177,9 +357,8 @@ IMPORTANT: Respond with ONLY a JSON object having this structure:
             return RiskLevel.DANGEROUS
     def _format_confidence(self, confidence):
         try:
-            conf_value = float(confidence)
-            return conf_value * 100
-        except:
+            return float(confidence) * 100
+        except (TypeError, ValueError, OverflowError):
             return 50.0
     def _error_response(self, message):
         return {
@@ -190,6 +369,98 @@ IMPORTANT: Respond with ONLY a JSON object having this structure:
             "recommended_action": "Manual review required",
             "analysis": message
         }
+def read_email_file(filename):
+    import mmap
+    import stat
+    with open(filename, 'rb') as f:
+        info = os.fstat(f.fileno())
+        if stat.S_ISREG(info.st_mode) and info.st_size > 0:
+            # Decode straight from the mapping without an intermediate bytes copy
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                email_text = str(mm, 'utf-8', errors='replace')
+        else:
+            email_text = f.read().decode('utf-8', errors='replace')
+    return email_text.replace('\r\n', '\n').replace('\r', '\n')
+def print_result(result, elapsed=None):
+    risk_level = result["risk_level"]
+    risk_colors = {
+        "Safe": "\033[92m",
+        "Suspicious": "\033[93m",
+        "Dangerous": "\033[91m"
+    }
+    color = risk_colors.get(risk_level, "")
+    reset = "\033[0m"
+    print("\n" + "=" * 60)
+    print(f"  {color}ANALYSIS RESULT: {risk_level}{reset}  ".center(60, "="))
+    print("=" * 60)
+    print(f"Risk Assessment: {color}{risk_level}{reset}")
+    print(f"Confidence: {result['confidence']:.1f}%")
+    if elapsed is not None:
+        print(f"Analysis time: {elapsed:.2f} seconds")
+    print("\nWarning signs detected:")
+    if result["reasons"]:
+        for i, reason in enumerate(result["reasons"], 1):
+            print(f"  {i}. {reason}")
+    else:
+        print("  None found")
+    print(f"\nRecommended Action: {result['recommended_action']}")
+    print("\nDetailed Analysis:")
+    print("-" * 60)
+    print(result["analysis"])
+    print("-" * 60)
+def decode_message_header(value):
+    from email.errors import HeaderParseError
+    from email.header import decode_header, make_header
+    try:
+        return str(make_header(decode_header(str(value))))
+    except (HeaderParseError, LookupError, ValueError):
+        return str(value)
+def message_to_text(message):
+    # Keep only the readable parts so attachments never reach the prompt
+    text_parts = []
+    for content_type in ("text/plain", "text/html"):
+        for part in message.walk():
+            if part.get_content_type() != content_type or part.get_filename():
+                continue
+            payload = part.get_payload(decode=True)
+            if payload is None:
+                continue
+            charset = part.get_content_charset() or "utf-8"
+            try:
+                text_parts.append(payload.decode(charset, errors="replace"))
+            except LookupError:
+                text_parts.append(payload.decode("utf-8", errors="replace"))
+        if text_parts:
+            break
+    return (f"From: {decode_message_header(message.get('From', ''))}\n"
+            f"Subject: {decode_message_header(message.get('Subject', ''))}\n\n"
+            + "\n".join(text_parts))
+def run_mbox(detector, path, debug_mode=False):
+    import asyncio
+    import mailbox
+    try:
+        email_texts = [message_to_text(message) for message in mailbox.mbox(path, create=False)]
+    except Exception as e:
+        print(f"Error reading mailbox: {e}")
+        sys.exit(1)
+    if not email_texts:
+        print("No emails found in mailbox!")
+        sys.exit(1)
+    print(f"Loaded {len(email_texts)} emails from {path}")
+    print("\nAnalyzing emails for threats...")
+    start_time = time.time()
+    try:
+        results = asyncio.run(detector.analyze_batch_async(email_texts))
+        elapsed = time.time() - start_time
+        for i, result in enumerate(results, 1):
+            print(f"\nEmail {i} of {len(results)}")
+            print_result(result)
+        print(f"\nAnalyzed {len(results)} emails in {elapsed:.2f} seconds")
+    except Exception as e:
+        print(f"Analysis failed: {e}")
+        if debug_mode:
+            import traceback
+            traceback.print_exc()
 def main():
     print("\n" + "=" * 60)
     print("  PHISHING SHIELD - EMAIL SECURITY ANALYZER  ".center(60, "="))
@@ -207,13 +478,19 @@ def main():
     except ValueError as e:
         print(f"Initialization failed: {e}")
         sys.exit(1)
+    if "--mbox" in sys.argv:
+        idx = sys.argv.index("--mbox")
+        if idx + 1 < len(sys.argv):
+            run_mbox(detector, sys.argv[idx + 1], debug_mode)
+            return
+        print("Error: No path provided after --mbox")
+        sys.exit(1)
     if "--file" in sys.argv:
         idx = sys.argv.index("--file")
         if idx + 1 < len(sys.argv):
             filename = sys.argv[idx + 1]
             try:
-                with open(filename, 'r') as f:
-                    email_text = f.read()
+                email_text = read_email_file(filename)
                 print(f"Loaded email from {filename}")
             except Exception as e:
                 print(f"Error reading file: {e}")
@@ -226,14 +503,10 @@ def main():
         print("- Windows: Press Ctrl+Z then Enter")
         print("- Mac/Linux: Press Ctrl+D")
         print("-" * 60)
-        email_lines = []
         try:
-            while True:
-                line = input()
-                email_lines.append(line)
-        except (EOFError, KeyboardInterrupt):
-            pass
-        email_text = "\n".join(email_lines)
+            email_text = sys.stdin.read()
+        except KeyboardInterrupt:
+            email_text = ""
     if not email_text.strip():
         print("No email text provided!")
         sys.exit(1)
@@ -242,31 +515,7 @@ def main():
     try:
         result = detector.analyze_email(email_text)
         elapsed = time.time() - start_time
-        risk_level = result["risk_level"]
-        risk_colors = {
-            "Safe": "\033[92m",
-            "Suspicious": "\033[93m",
-            "Dangerous": "\033[91m"
-        }
-        color = risk_colors.get(risk_level, "")
-        reset = "\033[0m"
-        print("\n" + "=" * 60)
-        print(f"  {color}ANALYSIS RESULT: {risk_level}{reset}  ".center(60, "="))
-        print("=" * 60)
-        print(f"Risk Assessment: {color}{risk_level}{reset}")
-        print(f"Confidence: {result['confidence']:.1f}%")
-        print(f"Analysis time: {elapsed:.2f} seconds")
-        print("\nWarning signs detected:")
-        if result["reasons"]:
-            for i, reason in enumerate(result["reasons"], 1):
-                print(f"  {i}. {reason}")
-        else:
-            print("  None found")
-        print(f"\nRecommended Action: {result['recommended_action']}")
-        print("\nDetailed Analysis:")
-        print("-" * 60)
-        print(result["analysis"])
-        print("-" * 60)
+        print_result(result, elapsed)
     except Exception as e:
         print(f"Analysis failed: {e}")
         if debug_mode:
@@ -1,7 +1,51 @@
-import random
+import os
 import string
-import bcrypt
 import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+_UPPER = frozenset(string.ascii_uppercase)
+_LOWER = frozenset(string.ascii_lowercase)
+_DIGITS = frozenset(string.digits)
+_SPECIAL = frozenset('!@#$%^&*(),.?":{}|<>')
+_REPEAT_RE = re.compile(r'(.)\1{2,}')
+
+PasswordStats = namedtuple(
+    'PasswordStats',
+    ['length', 'has_upper', 'has_lower', 'has_digit', 'has_special', 'has_repeat', 'unique_chars'],
+)
+
+_CHECKS = [
+    (lambda stats: stats.length >= 12, "Consider using at least 12 characters."),
+    (lambda stats: stats.has_upper, "Include at least one uppercase letter."),
+    (lambda stats: stats.has_lower, "Include at least one lowercase letter."),
+    (lambda stats: stats.has_digit, "Include at least one number."),
+    (lambda stats: stats.has_special, "Include at least one special character."),
+]
+
+def _analyze(password):
+    # One pass over the password collects every character-class flag
+    has_upper = has_lower = has_digit = has_special = False
+    seen = set()
+    for c in password:
+        seen.add(c)
+        if c in _UPPER:
+            has_upper = True
+        elif c in _LOWER:
+            has_lower = True
+        elif c in _DIGITS:
+            has_digit = True
+        elif c in _SPECIAL:
+            has_special = True
+    return PasswordStats(
+        length=len(password),
+        has_upper=has_upper,
+        has_lower=has_lower,
+        has_digit=has_digit,
+        has_special=has_special,
+        has_repeat=_REPEAT_RE.search(password) is not None,
+        unique_chars=len(seen),
+    )
 
 class PasswordGenerator:
     def __init__(self, length=12, use_uppercase=True, use_lowercase=True, use_numbers=True, use_special=True):
@@ -10,8 +54,18 @@ class PasswordGenerator:
         self.use_lowercase = use_lowercase
         self.use_numbers = use_numbers
         self.use_special = use_special
+        self._pool = None
+        self._pool_options = None
 
-    def generate_password(self):
+    def _get_pool(self):
+        # Rebuild only when one of the use_* options has changed since last call
+        options = (self.use_uppercase, self.use_lowercase, self.use_numbers, self.use_special)
+        if options != self._pool_options:
+            self._pool = self._build_pool()
+            self._pool_options = options
+        return self._pool
+
+    def _build_pool(self):
         character_pool = ''
         if self.use_uppercase:
             character_pool += string.ascii_uppercase
@@ -21,22 +75,30 @@ class PasswordGenerator:
             character_pool += string.digits
         if self.use_special:
             character_pool += string.punctuation
+        return tuple(character_pool)
 
-        if not character_pool:
+    def generate_password(self):
+        pool = self._get_pool()
+        if not pool:
             raise ValueError("At least one character type must be selected.")
 
-        password = ''.join(random.choice(character_pool) for _ in range(self.length))
-        return password
+        # Rejection-sample OS random bytes masked to the next power of two
+        # so every character in the pool is equally likely
+        n = len(pool)
+        mask = (1 << (n - 1).bit_length()) - 1
+        out = []
+        while len(out) < self.length:
+            for b in os.urandom(self.length * 2):
+                b &= mask
+                if b < n:
+                    out.append(pool[b])
+                    if len(out) == self.length:
+                        break
+        return ''.join(out)
 
 class PasswordStrengthChecker:
     def check_strength(self, password):
-        length_score = len(password) >= 12
-        upper_score = re.search(r'[A-Z]', password) is not None
-        lower_score = re.search(r'[a-z]', password) is not None
-        number_score = re.search(r'[0-9]', password) is not None
-        special_score = re.search(r'[!@#$%^&*(),.?":{}|<>]', password) is not None
-
-        score = sum([length_score, upper_score, lower_score, number_score, special_score])
+        score, insights = self._evaluate(password)
 
         strength = "Weak"
         if score >= 4:
@@ -44,35 +106,38 @@ class PasswordStrengthChecker:
         elif score == 3:
             strength = "Moderate"
 
-        return strength, self.get_security_insights(password)
+        return strength, insights
 
     def get_security_insights(self, password):
-        insights = []
-        if len(password) < 12:
-            insights.append("Consider using at least 12 characters.")
-        if not re.search(r'[A-Z]', password):
-            insights.append("Include at least one uppercase letter.")
-        if not re.search(r'[a-z]', password):
-            insights.append("Include at least one lowercase letter.")
-        if not re.search(r'[0-9]', password):
-            insights.append("Include at least one number.")
-        if not re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
-            insights.append("Include at least one special character.")
-        if re.search(r'(.)\1{2,}', password):
+        return self._evaluate(password)[1]
+
+    def _evaluate(self, password):
+        stats = _analyze(password)
+        results = [(check(stats), message) for check, message in _CHECKS]
+        score = sum(ok for ok, _ in results)
+        insights = [message for ok, message in results if not ok]
+        if stats.has_repeat:
             insights.append("Avoid repeating characters.")
-        if len(set(password)) < len(password) / 2:
+        if stats.unique_chars < stats.length / 2:
             insights.append("Avoid using too many similar characters.")
 
-        return insights
+        return score, insights
 
 class PasswordStorage:
     @staticmethod
     def hash_password(password):
+        import bcrypt
         # Generate a salt and hash the password
         salt = bcrypt.gensalt()
         hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
         return hashed_password
 
+    @staticmethod
+    def hash_passwords(passwords, max_workers=None):
+        # bcrypt is CPU-bound, so spread a batch across processes
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(PasswordStorage.hash_password, passwords))
+
 # Example usage
 if __name__ == "__main__":
     # Password Generation